@@ -0,0 +1,155 @@
+"""
+Instruction Compiler
+--------------------
+The agent's instruction is sent with every single Gemini call, so every word
+in it is paid for again on every turn. Most of those words are step 1, the
+routing rule that makes the model pick the right tool first.
+
+This script treats that choice as a DSPy program (request -> first tool),
+starts it from the hand-written routing rule, and lets COPRO search for other
+wordings, scoring each on correct routes with a penalty for length. If the
+winner is shorter and routes the training requests at least as well as the
+original, it's written to agents/instruction_compiled.txt.
+
+Only the routing rule is ever reworded - steps 2 and 3 (errors go to the
+brain, always report) are added back unchanged by build_instruction. And the
+agent doesn't pick the file up by itself: read it, then set
+SENTINEL_COMPILED_INSTRUCTION=agents/instruction_compiled.txt.
+
+Usage: python -m agents.compile_instruction
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import dspy
+from dspy.teleprompt import COPRO
+
+from agents.sentinel_agent import DEFAULT_ROUTING, INSTRUCTION_PATH
+from modules.rca_brain import _count_tokens, init_llm
+
+TOOLS = "\n".join([
+    "list_active_containers() - what's running",
+    "get_container_logs(container_name, tail=50) - recent logs for one container",
+    "get_many_container_logs(names, tail=50) - recent logs for several containers at once",
+    "consult_sre_expert(container_name, logs) - root cause + action for logs with errors",
+    "run_incident_plan(request) - investigate several services end to end, in parallel",
+])
+
+
+# The docstring is only a placeholder: Router swaps in the routing rule being
+# tried, starting from DEFAULT_ROUTING.
+class RouteRequest(dspy.Signature):
+    """Pick the first tool to call."""
+
+    request: str = dspy.InputField(desc="What the operator asked for")
+    tools: str = dspy.InputField(desc="The tools available, one per line")
+    tool: str = dspy.OutputField(desc="The name of the first tool to call, and nothing else")
+
+
+# What our SREs would reach for first. One or two per tool, worded the way
+# people actually ask.
+_ROUTES = [
+    ("What's running right now?", "list_active_containers"),
+    ("Is anything up on this host?", "list_active_containers"),
+    ("Check logs for chaos-monkey and fix any critical errors.", "get_container_logs"),
+    ("Why does worker-node keep crashing?", "get_container_logs"),
+    ("Pull the latest logs from payments-api, auth-service and cart.", "get_many_container_logs"),
+    ("Show me what frontend-ui and production-db have been logging.", "get_many_container_logs"),
+    ("worker-node logged 'java.lang.OutOfMemoryError: Java heap space' - what should we do?",
+     "consult_sre_expert"),
+    ("Checkout, cart and payments are all failing. Find out why and what to do about each.",
+     "run_incident_plan"),
+]
+
+trainset = [
+    dspy.Example(request=request, tools=TOOLS, tool=tool).with_inputs("request", "tools")
+    for request, tool in _ROUTES
+]
+
+
+# How much COPRO's score rewards brevity. A wrong route scores 0, and even an
+# empty instruction gains at most this much per example, so routing still
+# dominates the score - and compile() rejects any winner that routes worse.
+LENGTH_WEIGHT = 0.2
+BASELINE_TOKENS = _count_tokens(DEFAULT_ROUTING)
+
+
+def routes_correctly(example, prediction, trace=None):
+    """Did the model pick the tool we would have?"""
+    return prediction.tool.strip().strip("'`\"") == example.tool
+
+
+def routes_compactly(example, prediction, trace=None):
+    """
+    COPRO's metric: a correct route scores up to 1, less the longer the
+    instruction that produced it, relative to the hand-written one. Without
+    this, COPRO has no reason to prefer a shorter wording - and its rewrites
+    tend to come out longer.
+    """
+    if not routes_correctly(example, prediction):
+        return 0.0
+    ratio = _count_tokens(prediction.instruction) / BASELINE_TOKENS
+    return max(0.0, 1.0 - LENGTH_WEIGHT * ratio)
+
+
+class Router(dspy.Module):
+    """The routing predictor, reporting which routing rule it answered with."""
+
+    def __init__(self, instruction):
+        super().__init__()
+        self.route = dspy.Predict(RouteRequest.with_instructions(instruction.strip()))
+
+    def forward(self, request, tools):
+        prediction = self.route(request=request, tools=tools)
+        # COPRO swaps the signature in place, so read it at call time
+        return dspy.Prediction(tool=prediction.tool, instruction=self.route.signature.instructions)
+
+
+def _accuracy(program):
+    def correct(example):
+        try:
+            return routes_correctly(example, program(**example.inputs()))
+        except Exception:
+            return False  # A malformed answer is a wrong answer
+
+    with ThreadPoolExecutor(max_workers=min(8, len(trainset))) as pool:
+        return sum(pool.map(correct, trainset)) / len(trainset)
+
+
+def compile():
+    """
+    Search for a shorter routing rule, then keep it only if it's both shorter
+    and no less accurate than the one we have. Otherwise nothing is written.
+    """
+    print("🧭 Compiling agent instruction...")
+    init_llm()
+
+    baseline = Router(DEFAULT_ROUTING)
+    baseline_accuracy = _accuracy(baseline)
+
+    teleprompter = COPRO(metric=routes_compactly, breadth=6, depth=2)
+    compiled = teleprompter.compile(baseline, trainset=trainset, eval_kwargs={"num_threads": 8})
+    candidate = compiled.route.signature.instructions.strip()
+    candidate_accuracy = _accuracy(Router(candidate))
+
+    candidate_tokens = _count_tokens(candidate)
+    print(f"   baseline:  {BASELINE_TOKENS} tokens, {baseline_accuracy:.0%} routed correctly")
+    print(f"   candidate: {candidate_tokens} tokens, {candidate_accuracy:.0%} routed correctly")
+
+    # ADK reads {...} in an instruction as a session state placeholder, so a
+    # candidate with braces in it would break the agent
+    if "{" in candidate or "}" in candidate:
+        print("⚠️  Candidate uses braces - keeping the hand-written routing rule")
+        return
+    if candidate_tokens >= BASELINE_TOKENS or candidate_accuracy < baseline_accuracy:
+        print("⚠️  No shorter routing rule routes as well - keeping the hand-written one")
+        return
+
+    with open(INSTRUCTION_PATH, "w") as f:
+        f.write(candidate + "\n")
+    print(f"✅ Routing rule compiled and saved to {INSTRUCTION_PATH}:\n{candidate}")
+    print(f"   Review it, then set SENTINEL_COMPILED_INSTRUCTION={INSTRUCTION_PATH} to use it")
+
+
+if __name__ == "__main__":
+    compile()
@@ -0,0 +1,36 @@
+"""
+Ops Toolbox
+-----------
+Most tool calls come from the model, but a few parts of the runtime (the plan
+executor, speculative restarts) need to call the MCP tools themselves. This is
+the small shim that lets them do it through the agent's existing toolset, so
+everything still goes through the one ops_server process.
+"""
+
+import json
+
+
+def tool_text(result) -> str:
+    """Flatten an MCP tool result (dict or CallToolResult) down to its text."""
+    if isinstance(result, str):
+        return result
+    content = result.get("content") if isinstance(result, dict) else getattr(result, "content", None)
+    if content is None:
+        return json.dumps(result, default=str)
+    texts = [c.get("text") if isinstance(c, dict) else getattr(c, "text", None) for c in content]
+    return "\n".join(t for t in texts if t)
+
+
+class OpsToolbox:
+    """Calls MCP tools by name. Tools are listed once, on first use."""
+
+    def __init__(self, ops_tools):
+        self._ops_tools = ops_tools
+        self._tools = None
+
+    async def call(self, name, args, tool_context) -> str:
+        if self._tools is None:
+            # No readonly context here, so runtime-only tools are included
+            self._tools = {t.name: t for t in await self._ops_tools.get_tools()}
+        result = await self._tools[name].run_async(args=args, tool_context=tool_context)
+        return tool_text(result)
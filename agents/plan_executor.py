@@ -0,0 +1,149 @@
+"""
+Plan Executor
+-------------
+Left to its own devices, the agent checks services one at a time: fetch logs,
+wait, analyze, wait, next container, wait. Asking it to look at five services
+means five serial Docker + LLM round-trips.
+
+This module plans the whole investigation once (LLMCompiler-style) and then
+runs it as a DAG. Independent steps - e.g. log fetches for different
+containers - fan out in parallel, and each analysis starts the moment its own
+logs arrive instead of waiting for every fetch to finish.
+"""
+
+import asyncio
+import inspect
+import json
+import re
+from graphlib import CycleError, TopologicalSorter
+
+import dspy
+
+from agents.ops_toolbox import OpsToolbox
+from modules.rca_brain import IncidentPlan
+
+# What the planner is allowed to call. restart_service is deliberately not
+# here - actions stay in the agent loop, where the brain's verdict gates them.
+PLANNABLE_TOOLS = {
+    "list_active_containers": "list_active_containers() - what's running",
+    "get_container_logs": "get_container_logs(container_name, tail=50) - recent logs",
+    "consult_sre_expert": "consult_sre_expert(container_name, logs) - root cause + action",
+}
+
+_STEP_REF = re.compile(r"\$(\d+)")
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def parse_plan(raw: str) -> list[dict]:
+    """
+    Turn the planner's JSON into validated steps.
+
+    Any "$N" reference in the args is added to depends_on automatically -
+    the model sometimes forgets the edge even when it uses the output.
+    """
+    steps = json.loads(_CODE_FENCE.sub("", raw.strip()))
+    if not isinstance(steps, list):
+        raise ValueError("Plan must be a JSON list of steps")
+
+    parsed = []
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict):
+            raise ValueError(f"Step {index} is not an object")
+        tool = step.get("tool")
+        if tool not in PLANNABLE_TOOLS:
+            raise ValueError(f"Step {index} uses unsupported tool '{tool}'")
+
+        args = step.get("args") or {}
+        if not isinstance(args, dict):
+            raise ValueError(f"Step {index} args must be an object")
+        depends_on = {int(d) for d in step.get("depends_on") or []}
+        for value in args.values():
+            if isinstance(value, str):
+                depends_on.update(int(ref) for ref in _STEP_REF.findall(value))
+
+        if any(d == index or not 0 <= d < len(steps) for d in depends_on):
+            raise ValueError(f"Step {index} has an invalid dependency: {sorted(depends_on)}")
+
+        parsed.append({"tool": tool, "args": args, "depends_on": sorted(depends_on)})
+    return parsed
+
+
+def _substitute(value, outputs):
+    """Swap "$N" references in an argument for the output of step N."""
+    if not isinstance(value, str):
+        return value
+    match = _STEP_REF.fullmatch(value)
+    if match:
+        return outputs[int(match.group(1))]
+    return _STEP_REF.sub(lambda m: _as_text(outputs[int(m.group(1))]), value)
+
+
+def _as_text(output):
+    return output if isinstance(output, str) else json.dumps(output, default=str)
+
+
+class PlanExecutor:
+    """
+    Plans an investigation with the IncidentPlan signature, then executes it.
+
+    MCP tools are looked up from the toolset the agent already has, so plans
+    go through the same ops_server process as every other tool call.
+    """
+
+    def __init__(self, ops_tools, local_tools):
+        self._toolbox = OpsToolbox(ops_tools)
+        self._local_tools = local_tools
+        self._planner = dspy.Predict(IncidentPlan)
+
+    async def plan(self, request: str) -> list[dict]:
+        tools = "\n".join(PLANNABLE_TOOLS.values())
+        prediction = await asyncio.to_thread(self._planner, request=request, tools=tools)
+        return parse_plan(prediction.plan)
+
+    async def call_tool(self, name, args, tool_context):
+        if name in self._local_tools:
+            tool = self._local_tools[name]
+            if inspect.iscoroutinefunction(tool):
+                return await tool(**args)
+            # Blocking local tools stay off the event loop
+            return await asyncio.to_thread(tool, **args)
+        return await self._toolbox.call(name, args, tool_context)
+
+    async def execute(self, steps: list[dict], tool_context) -> list[dict]:
+        """
+        Run every step as soon as its dependencies are done.
+
+        Each step becomes a task that awaits its parents' tasks, so there's no
+        level-by-level barrier: a slow log fetch only holds up its own analysis.
+        """
+        graph = {i: step["depends_on"] for i, step in enumerate(steps)}
+        try:
+            order = list(TopologicalSorter(graph).static_order())
+        except CycleError as e:
+            raise ValueError(f"Plan has a dependency cycle: {e.args[1]}")
+
+        tasks = {}
+        outputs = {}
+
+        async def run_step(index):
+            step = steps[index]
+            await asyncio.gather(*(tasks[d] for d in step["depends_on"]))
+            args = {k: _substitute(v, outputs) for k, v in step["args"].items()}
+            outputs[index] = await self.call_tool(step["tool"], args, tool_context)
+
+        # Dependencies come first in topological order, so their tasks exist
+        # by the time a dependent step is scheduled.
+        for index in order:
+            tasks[index] = asyncio.ensure_future(run_step(index))
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        report = []
+        for index, step in enumerate(steps):
+            entry = {"step": index, "tool": step["tool"], "args": step["args"]}
+            error = tasks[index].exception()
+            if error is not None:
+                entry["error"] = str(error)
+            else:
+                entry["result"] = outputs[index]
+            report.append(entry)
+        return report
@@ -12,25 +12,82 @@ Gemini's base knowledge - it's been taught our specific patterns.
 """
 
 import asyncio
+import functools
+import os
 from dotenv import load_dotenv
 from google.adk.agents import LlmAgent
-from google.adk.tools import McpToolset
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.tools import McpToolset, ToolContext
+from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from mcp.client.stdio import StdioServerParameters
 from google.genai import types
-from modules.rca_brain import SREBrain
+from agents.plan_executor import PlanExecutor
+from agents.speculation import SpeculativeRestarts, hide_runtime_tools
+from modules.brain_cache import CachedSREBrain
+from modules.fast_triage import triage
+from modules.local_classifier import get_local_classifier
+from modules.rca_brain import init_llm
 
 load_dotenv()
 
-# Load the DSPy brain at module level so it's ready before any requests come in.
-# The compiled weights contain few-shot examples that dramatically improve accuracy.
-brain_instance = SREBrain()
-if hasattr(brain_instance, "load_production_weights"):
-    brain_instance.load_production_weights("modules/brain_compiled.json")
+# Step 1 decides which tool the model reaches for first - that's the part
+# agents/compile_instruction.py may reword to save tokens. Steps 2 and 3 keep
+# restarts behind the brain and are never reworded.
+DEFAULT_ROUTING = """When asked to check a service, FIRST use 'list_active_containers' or 'get_container_logs'.
+   If you need logs from more than one container, fetch them together with 'get_many_container_logs'.
+   If the request covers more than one service end to end, use 'run_incident_plan' instead."""
 
+_INSTRUCTION_TEMPLATE = """
+You are an Autonomous Site Reliability Engineer (SRE).
+1. {routing}
+2. If you see errors, pass them to 'consult_sre_expert'.
+3. Always report the final status.
+"""
+
+
+def build_instruction(routing=DEFAULT_ROUTING):
+    """The agent instruction with the given routing rule as step 1."""
+    return _INSTRUCTION_TEMPLATE.format(routing=routing.strip())
+
+
+DEFAULT_INSTRUCTION = build_instruction()
+INSTRUCTION_PATH = "agents/instruction_compiled.txt"
+
+
+@functools.cache
+def load_instruction():
+    """
+    The hand-written instruction, unless SENTINEL_COMPILED_INSTRUCTION names
+    a compiled routing rule. That's opt-in on purpose: a compiled file is only
+    used once someone has read it and pointed the variable at it.
+    """
+    path = os.getenv("SENTINEL_COMPILED_INSTRUCTION")
+    if not path:
+        return DEFAULT_INSTRUCTION
+    with open(path) as f:
+        routing = f.read().strip()
+    return build_instruction(routing) if routing else DEFAULT_INSTRUCTION
+
+
+@functools.lru_cache(maxsize=1)
+def get_brain():
+    """
+    The shared DSPy brain, loaded on first use.
 
-def consult_sre_expert(container_name: str, logs: str) -> dict:
+    The compiled weights contain few-shot examples that dramatically improve accuracy.
+    The cached wrapper answers repeat incidents without another Gemini round-trip.
+    Loading is deferred so importing this module (tests, tooling) stays cheap -
+    the API server warms it up in its startup hook instead.
+    """
+    init_llm()
+    brain = CachedSREBrain(local_classifier=get_local_classifier())
+    brain.load_production_weights("modules/brain_compiled.json")
+    return brain
+
+
+async def consult_sre_expert(container_name: str, logs: str) -> dict:
     """
     The agent calls this when it spots errors in container logs.
 
@@ -38,8 +95,15 @@ def consult_sre_expert(container_name: str, logs: str) -> dict:
     trained DSPy module. It returns structured output: root cause, severity,
     and what action to take. Much more reliable than raw prompting.
     """
-    print(f"\n🧠 [Brain] Analyzing logs for {container_name}...")
-    prediction = brain_instance(container_name=container_name, logs=logs)
+    # Known hands-off signatures (auth failure, remote DB down, ...) don't need the LLM at all
+    prediction = triage(logs)
+    if prediction is not None:
+        print(f"\n⚡ [Triage] Known incident signature for {container_name} - skipping the brain")
+    else:
+        print(f"\n🧠 [Brain] Analyzing logs for {container_name}...")
+        # ADK runs sync tools right on the event loop, and the brain blocks on
+        # Gemini - in a thread, every other request keeps moving meanwhile
+        prediction = await asyncio.to_thread(get_brain(), container_name=container_name, logs=logs)
     return {
         "analysis": prediction.reasoning,
         "root_cause": prediction.root_cause,
@@ -48,43 +112,105 @@ def consult_sre_expert(container_name: str, logs: str) -> dict:
     }
 
 
+def _ops_connection_params():
+    """
+    MCP lets us run the Docker tools in a separate process.
+
+    If SENTINEL_OPS_URL points at a running ops server (servers/ops_server.py --http),
+    we connect to that, so every worker shares one backend. Otherwise we spawn
+    our own copy and talk to it via stdin/stdout.
+    """
+    ops_url = os.getenv("SENTINEL_OPS_URL")
+    if ops_url:
+        return StreamableHTTPConnectionParams(url=ops_url)
+    return StdioServerParameters(
+        command="python",
+        args=["servers/ops_server.py"]
+    )
+
+
 def create_sentinel():
     """
     Factory function that assembles the agent with all its tools.
 
-    Two tool sources:
+    Three tool sources:
     1. MCP server (ops_server.py) - gives us Docker access
     2. consult_sre_expert - our DSPy brain for analysis
+    3. run_incident_plan - plans multi-service checks once and runs them in parallel
     """
-    # MCP lets us run the Docker tools in a separate process.
-    # The agent talks to it via stdin/stdout using the MCP protocol.
     ops_tools = McpToolset(
-        connection_params=StdioServerParameters(
-            command="python",
-            args=["servers/ops_server.py"]
-        )
+        connection_params=_ops_connection_params(),
+        tool_filter=hide_runtime_tools
     )
 
+    speculation = SpeculativeRestarts(ops_tools)
+    executor = PlanExecutor(ops_tools, {"consult_sre_expert": consult_sre_expert})
+
+    async def run_incident_plan(request: str, tool_context: ToolContext) -> dict:
+        """
+        Investigate several services at once.
+
+        Plans the log fetches and analyses for the request up front, then runs
+        independent steps in parallel. Returns every step's result. Use this
+        instead of calling get_container_logs one container at a time.
+        """
+        try:
+            steps = await executor.plan(request)
+            return {"steps": await executor.execute(steps, tool_context)}
+        except (ValueError, TypeError) as e:
+            # A bad plan (broken JSON, unknown tool, cycle) shouldn't abort the
+            # whole run - tell the model, and it can check services one by one
+            return {"error": f"Could not run the plan: {e}. Check the services one at a time instead."}
+
     agent = LlmAgent(
         model="gemini-2.5-flash",
         name="Sentinel_Prime",
-        instruction="""
-        You are an Autonomous Site Reliability Engineer (SRE).
-        1. When asked to check a service, FIRST use 'list_active_containers' or 'get_container_logs'.
-        2. If you see errors, pass them to 'consult_sre_expert'.
-        3. Always report the final status.
-        """,
-        tools=[ops_tools, consult_sre_expert]
+        # Static, with no {state} placeholders, so it's an identical prefix on
+        # every call - the part Gemini's implicit prompt caching can reuse
+        instruction=load_instruction(),
+        tools=[ops_tools, consult_sre_expert, run_incident_plan],
+        # Stage restarts as soon as logs look bad; commit only on the brain's say-so
+        after_tool_callback=speculation.after_tool,
+        before_tool_callback=speculation.before_tool
     )
     return agent
 
 
+async def stream_response_text(runner, session_id, user_id, new_message, streaming=True):
+    """
+    Yield the agent's answer text as it's generated.
+
+    With streaming on, ADK emits partial events token-by-token and then one
+    final event repeating the same text in full. We pass the partials through
+    and skip that final copy, so callers never see text twice.
+    """
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
+    streamed = False
+    async for event in runner.run_async(
+        session_id=session_id,
+        user_id=user_id,
+        new_message=new_message,
+        run_config=run_config
+    ):
+        if not (event.content and event.content.parts):
+            continue
+        if event.partial:
+            streamed = True
+        elif streamed:
+            streamed = False
+            continue
+        for part in event.content.parts:
+            if part.text:
+                yield part.text
+
+
 async def main():
     """
     Interactive REPL for testing the agent locally.
     For production, use api_server.py instead.
     """
     print("⏳ Initializing Sentinel...")
+    get_brain()
     agent = create_sentinel()
 
     # ADK needs a session service to track conversation state
@@ -118,19 +244,11 @@ async def main():
                 parts=[types.Part(text=user_input)]
             )
 
-            # Stream responses - the agent might call multiple tools before answering
-            final_text = ""
-            async for event in runner.run_async(
-                session_id=session_id,
-                user_id=user_id,
-                new_message=user_msg
-            ):
-                if event.content and event.content.parts:
-                    for part in event.content.parts:
-                        if part.text:
-                            final_text += part.text
-
-            print(f"Sentinel: {final_text}")
+            # Print as it streams in - the agent might call multiple tools before answering
+            print("Sentinel: ", end="", flush=True)
+            async for text in stream_response_text(runner, session_id, user_id, user_msg):
+                print(text, end="", flush=True)
+            print()
 
         except KeyboardInterrupt:
             break
@@ -0,0 +1,232 @@
+"""
+Session Storage
+---------------
+ADK's InMemorySessionService keeps every conversation in the memory of one
+process. That's fine for the REPL, but run uvicorn with several workers and
+each request lands on a random one - half the time the session it needs is
+in some other worker's RAM, and the brain has to start from scratch.
+
+RedisSessionService keeps sessions in Redis instead, so any worker can pick
+up any conversation. Sessions are msgpack-encoded (smaller and quicker than
+JSON) and expire after a day of inactivity.
+
+Without Redis we fall back to memory, but bounded: session ids come straight
+from API callers, and an unbounded store is both a slow leak and a very cheap
+way for someone to run the server out of RAM.
+"""
+
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+import msgpack
+import redis.asyncio as aioredis
+from redis.exceptions import WatchError
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+try:
+    from prometheus_client import Gauge
+    _SESSIONS_GAUGE = Gauge("sentinel_in_memory_sessions", "Sessions held by the in-memory session store")
+except ImportError:
+    _SESSIONS_GAUGE = None
+
+SESSION_TTL_SECONDS = 24 * 60 * 60
+MAX_IN_MEMORY_SESSIONS = int(os.getenv("SENTINEL_MAX_SESSIONS", "10000"))
+
+
+def make_session_service():
+    """Redis-backed when REDIS_URL is set, bounded in-memory otherwise."""
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisSessionService(redis_url)
+    return BoundedInMemorySessionService()
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """
+    InMemorySessionService that holds at most max_sessions sessions.
+
+    Once full, creating a session evicts the least recently used one. Reading
+    a session counts as using it, so active conversations are the last to go.
+    """
+
+    def __init__(self, max_sessions: int = MAX_IN_MEMORY_SESSIONS):
+        super().__init__()
+        self._max_sessions = max_sessions
+        self._recency = OrderedDict()  # (app_name, user_id, session_id) -> None, oldest first
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        key = (app_name, user_id, session.id)
+        self._recency[key] = None
+        self._recency.move_to_end(key)
+
+        while len(self._recency) > self._max_sessions:
+            (old_app, old_user, old_id), _ = self._recency.popitem(last=False)
+            await super().delete_session(app_name=old_app, user_id=old_user, session_id=old_id)
+
+        self._report_size()
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        key = (app_name, user_id, session_id)
+        if session is not None and key in self._recency:
+            self._recency.move_to_end(key)
+        return session
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._recency.pop((app_name, user_id, session_id), None)
+        self._report_size()
+
+    def _report_size(self):
+        if _SESSIONS_GAUGE is not None:
+            _SESSIONS_GAUGE.set(len(self._recency))
+
+
+class RedisSessionService(BaseSessionService):
+    """
+    Sessions stored under sentinel:sess:{app}:{user}:{session_id}.
+
+    A small per-user set tracks session ids so list_sessions doesn't need to
+    SCAN the keyspace. Every write refreshes the TTL, so only idle sessions expire.
+    Appends are WATCH/MULTI transactions, so concurrent requests on one
+    session don't overwrite each other's events.
+    """
+
+    def __init__(self, redis_url: str, ttl: int = SESSION_TTL_SECONDS, max_connections: int = 64):
+        pool = aioredis.ConnectionPool.from_url(redis_url, max_connections=max_connections)
+        self._redis = aioredis.Redis(connection_pool=pool)
+        self._ttl = ttl
+
+    @staticmethod
+    def _key(app_name, user_id, session_id):
+        return f"sentinel:sess:{app_name}:{user_id}:{session_id}"
+
+    @staticmethod
+    def _index_key(app_name, user_id):
+        return f"sentinel:sess-index:{app_name}:{user_id}"
+
+    @staticmethod
+    def _dump(session: Session) -> bytes:
+        return msgpack.packb(session.model_dump(mode="json"))
+
+    @staticmethod
+    def _load(payload: bytes) -> Session:
+        return Session.model_validate(msgpack.unpackb(payload))
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        session = Session(
+            id=session_id or uuid.uuid4().hex,
+            app_name=app_name,
+            user_id=user_id,
+            state=dict(state or {}),
+            last_update_time=time.time(),
+        )
+
+        key = self._key(app_name, user_id, session.id)
+        if not await self._redis.set(key, self._dump(session), ex=self._ttl, nx=True):
+            raise ValueError(f"Session '{session.id}' already exists")
+
+        index_key = self._index_key(app_name, user_id)
+        await self._redis.sadd(index_key, session.id)
+        await self._redis.expire(index_key, self._ttl)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        payload = await self._redis.get(self._key(app_name, user_id, session_id))
+        if payload is None:
+            return None
+
+        session = self._load(payload)
+        if config:
+            if config.after_timestamp:
+                session.events = [e for e in session.events if e.timestamp >= config.after_timestamp]
+            if config.num_recent_events:
+                session.events = session.events[-config.num_recent_events:]
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        index_key = self._index_key(app_name, user_id)
+        sessions = []
+        for raw_id in await self._redis.smembers(index_key):
+            session_id = raw_id.decode()
+            payload = await self._redis.get(self._key(app_name, user_id, session_id))
+            if payload is None:
+                await self._redis.srem(index_key, raw_id)  # Expired - drop it from the index
+                continue
+            session = self._load(payload)
+            session.events = []  # Listing only needs metadata, same as the in-memory service
+            sessions.append(session)
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._redis.delete(self._key(app_name, user_id, session_id))
+        await self._redis.srem(self._index_key(app_name, user_id), session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        # The base class applies the state delta and appends to session.events.
+        # Partial (streaming) events aren't stored.
+        event = await super().append_event(session, event)
+        if event.partial:
+            return event
+
+        session.last_update_time = event.timestamp
+        key = self._key(session.app_name, session.user_id, session.id)
+
+        # Another worker may have appended to this session since we loaded it,
+        # so writing back our copy would drop its events. Instead apply the
+        # event to what's stored now, and retry if it changes under us.
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    payload = await pipe.get(key)
+                    if payload is None:
+                        stored = session  # Expired meanwhile - ours is all there is
+                    else:
+                        stored = self._load(payload)
+                        await super().append_event(stored, event)
+                        stored.last_update_time = event.timestamp
+                    pipe.multi()
+                    pipe.set(key, self._dump(stored), ex=self._ttl)
+                    await pipe.execute()
+                    return event
+                except WatchError:
+                    continue
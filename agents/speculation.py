@@ -0,0 +1,149 @@
+"""
+Speculative Restarts
+--------------------
+For the common crash patterns (OOM, heap exhaustion) the brain almost always
+says "restart". Rather than waiting for the verdict before even looking the
+container up, we stage the restart the moment the logs show an error and only
+pull the trigger once the agent actually calls restart_service.
+
+Staging is side-effect free - it resolves the container and checks its state,
+nothing more. If the brain says escalate or ignore, the staged restart is
+dropped. The restart itself still only happens when the agent asks for it.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from agents.ops_toolbox import OpsToolbox, tool_text
+
+# Tools the runtime uses behind the model's back. They're hidden from the
+# model so it doesn't waste tokens on them or try to call them itself.
+RUNTIME_ONLY_TOOLS = {"prepare_restart", "commit_restart", "cancel_restart"}
+
+# Anything that looks like a crash is worth staging a restart for - if we're
+# wrong, the brain's verdict cancels it and all we spent was a container lookup.
+_ERROR_SIGNATURE = re.compile(
+    r"\b(?:ERROR|FATAL|CRITICAL|PANIC)\b|Exception|OutOfMemory|heap space|Segmentation fault|Traceback",
+    re.IGNORECASE,
+)
+_TOKEN = re.compile(r"[0-9a-f]{32}")
+
+# The ops server forgets a prepared restart after PREPARED_RESTART_TTL
+# (servers/ops_server.py), so a staged one is no use to us after that either
+STAGED_RESTART_TTL = 120
+
+
+def _batch_logs(tool_response) -> dict:
+    """The name -> logs mapping from a get_many_container_logs response (empty if unparseable)."""
+    try:
+        logs = json.loads(tool_text(tool_response))
+    except ValueError:
+        return {}
+    if not isinstance(logs, dict):
+        return {}
+    return {name: text for name, text in logs.items() if isinstance(text, str)}
+
+
+def _pending_key(tool_context, container_name):
+    """Staged restarts belong to the conversation that staged them."""
+    session = getattr(tool_context, "session", None)
+    if session is None:
+        return (None, None, container_name)
+    return (session.user_id, session.id, container_name)
+
+
+def hide_runtime_tools(tool, readonly_context=None) -> bool:
+    """
+    tool_filter for the agent's McpToolset.
+
+    When ADK builds the model's tool list it passes a ReadonlyContext; our own
+    lookups through OpsToolbox don't. So the model never sees the runtime-only
+    tools, but the runtime can still call them.
+    """
+    return readonly_context is None or tool.name not in RUNTIME_ONLY_TOOLS
+
+
+class SpeculativeRestarts:
+    """
+    Tool callbacks that stage restarts while the brain is still reasoning.
+
+    Wire after_tool/before_tool into the LlmAgent's after_tool_callback and
+    before_tool_callback.
+    """
+
+    def __init__(self, ops_tools):
+        self._toolbox = OpsToolbox(ops_tools)
+        # (user_id, session_id, container_name) -> (staged_at, task resolving
+        # to the prepare_restart response). One instance serves every session,
+        # so one conversation's verdict must never touch another's restart.
+        self._pending = {}
+
+    async def after_tool(self, tool, args, tool_context, tool_response):
+        if tool.name == "get_container_logs":
+            self._stage_if_crashing(args.get("container_name"), tool_text(tool_response), tool_context)
+
+        elif tool.name == "get_many_container_logs":
+            for container_name, logs in _batch_logs(tool_response).items():
+                self._stage_if_crashing(container_name, logs, tool_context)
+
+        elif tool.name == "consult_sre_expert":
+            container_name = args.get("container_name")
+            action = tool_response.get("recommended_action") if isinstance(tool_response, dict) else None
+            if container_name and action != "restart_service":
+                await self._discard(_pending_key(tool_context, container_name), tool_context)
+
+        return None  # Never change what the model sees
+
+    def _stage_if_crashing(self, container_name, logs, tool_context):
+        self._drop_expired()
+        key = _pending_key(tool_context, container_name)
+        if container_name and key not in self._pending and _ERROR_SIGNATURE.search(logs):
+            self._pending[key] = (time.monotonic(), asyncio.create_task(
+                self._toolbox.call("prepare_restart", {"container_name": container_name}, tool_context)
+            ))
+
+    async def before_tool(self, tool, args, tool_context):
+        if tool.name != "restart_service":
+            return None
+
+        self._drop_expired()
+        _, task = self._pending.pop(_pending_key(tool_context, args.get("container_name")), (None, None))
+        token = await self._token(task)
+        if token is None:
+            return None  # Nothing staged (or staging failed) - run the normal restart
+
+        response = await self._toolbox.call("commit_restart", {"token": token}, tool_context)
+        if not response.startswith("✅"):
+            return None  # The server lost the token - fall back to the normal restart
+        return {"result": response}
+
+    def _drop_expired(self):
+        """Forget staged restarts the ops server has already forgotten."""
+        now = time.monotonic()
+        for key, (staged_at, task) in list(self._pending.items()):
+            if now - staged_at > STAGED_RESTART_TTL:
+                del self._pending[key]
+                task.cancel()  # No-op if it's done; its token has expired on the server
+
+    async def _discard(self, key, tool_context):
+        _, task = self._pending.pop(key, (None, None))
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()  # Any token it did get will expire on the server
+            return
+        token = await self._token(task)
+        if token is not None:
+            await self._toolbox.call("cancel_restart", {"token": token}, tool_context)
+
+    @staticmethod
+    async def _token(task):
+        if task is None:
+            return None
+        try:
+            response = await task
+        except Exception:
+            return None
+        return response if _TOKEN.fullmatch(response.strip()) else None
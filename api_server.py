@@ -8,39 +8,68 @@ I went with FastAPI because the automatic Swagger docs are genuinely useful for
 and the async support plays nicely with Google ADK's streaming responses.
 """
 
+import asyncio
+import os
+from typing import List
+
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
-from agents.sentinel_agent import create_sentinel
+from agents.sentinel_agent import create_sentinel, get_brain, stream_response_text
+from agents.sessions import make_session_service
+from modules.rca_brain import init_llm
 
+# orjson serializes straight to bytes and is several times faster than the
+# stdlib encoder FastAPI uses by default
 app = FastAPI(
     title="Sentinel SRE Agent API",
     description="Autonomous AI Agent for Root Cause Analysis",
+    default_response_class=ORJSONResponse,
 )
 
 # Globals to hold the agent and session state between requests.
-# Not ideal for horizontal scaling, but works fine for single-instance deployments.
+# Sessions live in Redis when REDIS_URL is set, so multiple workers can share
+# them; otherwise they're in this process's memory.
 agent_instance = None
 session_service = None
+runner_instance = None
+agent_runs = None
+
+# Cap on in-flight agent runs in this worker, across /analyze and
+# /analyze_batch alike. Gemini enforces per-minute request limits, so firing
+# 100 alerts at once just trades latency for 429s.
+MAX_CONCURRENT_RUNS = int(os.getenv("SENTINEL_MAX_CONCURRENT_RUNS", "16"))
+# Cap on requests in one /analyze_batch call. Each one is an agent run and
+# possibly a new session, so an unbounded batch is an easy way to flood both.
+BATCH_MAX_SIZE = int(os.getenv("SENTINEL_BATCH_MAX_SIZE", "100"))
+
+
+# Ids become session-store keys, so keep them short and boring - otherwise
+# a caller can mint unlimited distinct (and huge) keys.
+_ID_CONSTRAINTS = {"max_length": 128, "pattern": r"^[A-Za-z0-9_\-]+$"}
 
 
 class QueryRequest(BaseModel):
-    user_id: str = "api_user_01"
-    session_id: str = "session_001"
+    user_id: str = Field(default="api_user_01", **_ID_CONSTRAINTS)
+    session_id: str = Field(default="session_001", **_ID_CONSTRAINTS)
     query: str
 
-    class Config:
-        # Swagger UI will show this as an example - saves time when testing
-        json_schema_extra = {
+    # Requests are never modified after parsing, so make that a guarantee.
+    # Swagger UI will show the example - saves time when testing
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "user_id": "kunj369",
                 "session_id": "incident_123",
                 "query": "Check logs for chaos-monkey and fix any critical errors."
             }
         }
+    )
 
 
 @app.on_event("startup")
@@ -49,17 +78,82 @@ async def startup_event():
     Spin up the agent once when the server starts, not on every request.
     Loading the DSPy brain and MCP toolset takes a few seconds, so we do it here.
     """
-    global agent_instance, session_service
+    global agent_instance, session_service, runner_instance, agent_runs
     print("\n🚀 Booting up Sentinel Agent...")
 
+    init_llm()
+    get_brain()
     agent_instance = create_sentinel()
-    session_service = InMemorySessionService()
+    session_service = make_session_service()
+
+    # The Runner wires everything together: agent + session + tools.
+    # It keeps no per-session state (that all lives in the session service),
+    # so one instance serves every request instead of rebuilding it each time.
+    runner_instance = Runner(
+        agent=agent_instance,
+        app_name="Sentinel_API",
+        session_service=session_service
+    )
+
+    agent_runs = asyncio.Semaphore(MAX_CONCURRENT_RUNS)
 
     print("✅ Sentinel is online and ready.\n")
 
 
+async def _ensure_session(request: QueryRequest):
+    """
+    Sessions let us maintain conversation context across multiple requests.
+    If the session already exists, that's fine - just reuse it.
+    """
+    try:
+        await session_service.create_session(
+            session_id=request.session_id,
+            user_id=request.user_id,
+            app_name="Sentinel_API"
+        )
+    except Exception:
+        pass  # Session exists, no problem
+
+
+async def _stream_query(runner: Runner, request: QueryRequest, streaming: bool = True):
+    """
+    Run one query through the agent, yielding answer text as it arrives.
+    Every agent run goes through here, so this is where the run cap applies.
+    """
+    # Package the user's query in the format ADK expects
+    user_msg = types.Content(
+        role="user",
+        parts=[types.Part(text=request.query)]
+    )
+    async with agent_runs:
+        async for text in stream_response_text(
+            runner,
+            session_id=request.session_id,
+            user_id=request.user_id,
+            new_message=user_msg,
+            streaming=streaming
+        ):
+            yield text
+
+
+async def _run_query(runner: Runner, request: QueryRequest) -> str:
+    """Run one query through the agent and return the final answer text."""
+    # The agent might make multiple tool calls, so collect all the text
+    # parts and join them once at the end
+    chunks: list[str] = []
+    async for text in _stream_query(runner, request, streaming=False):
+        chunks.append(text)
+    return "".join(chunks)
+
+
+def _sse(data: dict, event: str | None = None) -> bytes:
+    """Encode one server-sent event."""
+    prefix = f"event: {event}\n".encode() if event else b""
+    return prefix + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
 @app.post("/analyze")
-async def analyze_incident(request: QueryRequest):
+async def analyze_incident(request: QueryRequest, accept: str = Header(default="")):
     """
     Main endpoint - send an incident description, get back an RCA.
 
@@ -67,52 +161,21 @@ async def analyze_incident(request: QueryRequest):
     1. Check container logs via MCP tools
     2. Run the logs through the DSPy-trained brain
     3. Return root cause + recommended action
-    """
-    global agent_instance, session_service
 
+    The answer streams back as server-sent events (`data: {"delta": ...}`) so
+    you see it forming instead of waiting for the last token. Clients that
+    send `Accept: application/json` (Swagger does) get one JSON body instead.
+    """
     try:
-        # Sessions let us maintain conversation context across multiple requests.
-        # If the session already exists, that's fine - just reuse it.
-        try:
-            await session_service.create_session(
-                session_id=request.session_id,
-                user_id=request.user_id,
-                app_name="Sentinel_API"
-            )
-        except Exception:
-            pass  # Session exists, no problem
-
-        # The Runner wires everything together: agent + session + tools
-        runner = Runner(
-            agent=agent_instance,
-            app_name="Sentinel_API",
-            session_service=session_service
-        )
+        await _ensure_session(request)
 
-        # Package the user's query in the format ADK expects
-        user_msg = types.Content(
-            role="user",
-            parts=[types.Part(text=request.query)]
-        )
-
-        # Stream the response - the agent might make multiple tool calls,
-        # so we accumulate all the text parts into one final answer
-        final_response = ""
-        async for event in runner.run_async(
-            session_id=request.session_id,
-            user_id=request.user_id,
-            new_message=user_msg
-        ):
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if part.text:
-                        final_response += part.text
-
-        return {
-            "status": "success",
-            "session_id": request.session_id,
-            "response": final_response
-        }
+        if "application/json" in accept and "text/event-stream" not in accept:
+            final_response = await _run_query(runner_instance, request)
+            return {
+                "status": "success",
+                "session_id": request.session_id,
+                "response": final_response
+            }
 
     except Exception as e:
         # Full traceback to console helps with debugging
@@ -120,6 +183,112 @@ async def analyze_incident(request: QueryRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+    async def event_generator():
+        try:
+            async for text in _stream_query(runner_instance, request):
+                yield _sse({"delta": text})
+            yield _sse({"status": "success", "session_id": request.session_id}, event="done")
+        except Exception as e:
+            # Headers are already sent, so errors go down the stream instead of a 500
+            import traceback
+            traceback.print_exc()
+            yield _sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+@app.post("/analyze_batch")
+async def analyze_batch(requests: List[QueryRequest]):
+    """
+    Triage many incidents in one call - e.g. replaying a backlog of alerts.
+
+    Agent runs are almost entirely waiting on Gemini and Docker, so different
+    sessions run concurrently (bounded by SENTINEL_MAX_CONCURRENT_RUNS), and a
+    batch can hold at most SENTINEL_BATCH_MAX_SIZE requests. Requests
+    that share a session still run in order, since each one builds on the
+    conversation so far - so a repeated query in a session ("check it again")
+    is a new turn and runs again. Repeated incidents across sessions are
+    absorbed by the brain's incident cache.
+    """
+    if len(requests) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(requests)} requests exceeds the limit of {BATCH_MAX_SIZE}"
+        )
+
+    results = [None] * len(requests)
+
+    by_session = {}
+    for index, request in enumerate(requests):
+        by_session.setdefault((request.user_id, request.session_id), []).append(index)
+
+    async def _run_one(index):
+        request = requests[index]
+        try:
+            response = await _run_query(runner_instance, request)
+            results[index] = {
+                "status": "success",
+                "session_id": request.session_id,
+                "response": response
+            }
+        except Exception as e:
+            results[index] = {
+                "status": "error",
+                "session_id": request.session_id,
+                "detail": str(e)
+            }
+
+    async def _run_session(indices):
+        await _ensure_session(requests[indices[0]])
+        for index in indices:
+            await _run_one(index)
+
+    outcomes = await asyncio.gather(
+        *[_run_session(indices) for indices in by_session.values()],
+        return_exceptions=True
+    )
+
+    # Anything that blew up before reaching _run_one (e.g. session setup)
+    # still gets reported per request rather than failing the whole batch.
+    for indices, outcome in zip(by_session.values(), outcomes):
+        if isinstance(outcome, Exception):
+            for index in indices:
+                if results[index] is None:
+                    results[index] = {
+                        "status": "error",
+                        "session_id": requests[index].session_id,
+                        "detail": str(outcome)
+                    }
+
+    return {"status": "success", "results": results}
+
+
+def _worker_count():
+    """
+    WEB_CONCURRENCY if it's set. Otherwise 4 workers with Redis, and just one
+    without - in-memory sessions live in one worker, so with several, the
+    next turn of a conversation usually lands somewhere that's never seen it.
+    """
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        workers = int(configured)
+        if workers > 1 and not os.getenv("REDIS_URL"):
+            print(f"⚠️  {workers} workers without REDIS_URL: each keeps its own sessions, "
+                  "so multi-turn conversations will lose context between requests")
+        return workers
+    return 4 if os.getenv("REDIS_URL") else 1
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Everything here is waiting on Gemini or Docker, so the faster uvloop event
+    # loop and httptools parser pay off directly. Multiple workers need an import
+    # string rather than the app object - and REDIS_URL, so they share sessions.
+    uvicorn.run(
+        "api_server:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=_worker_count(),
+        proxy_headers=True
+    )
@@ -0,0 +1,185 @@
+"""
+Brain Cache
+-----------
+Production incidents repeat themselves. The same OOM shows up on the same
+worker every few hours, and each time we were paying a full Gemini round-trip
+to be told "restart it" again.
+
+CachedSREBrain sits in front of SREBrain and answers repeat incidents from
+memory. Lookups go through three tiers:
+
+1. Exact match - logs are compressed the same way the brain sees them, then
+   canonicalized (timestamps, IPs, PIDs stripped) and hashed, so two copies
+   of the same crash at different times hit the same key.
+2. Semantic match - if sentence-transformers is installed, we embed the
+   canonical logs and reuse a prior answer above a cosine threshold.
+3. Redis - optional shared tier (set REDIS_URL) so every process benefits
+   from an answer any of them already paid for.
+
+CRITICAL verdicts are never cached. Those are the incidents where a stale
+answer hurts most, so they always get a fresh look from the model.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import threading
+
+import dspy
+from cachetools import LRUCache
+
+from modules.rca_brain import SREBrain, _compress_logs
+
+# sentence-transformers pulls in torch, which takes seconds to import, so
+# we only check it's installed here and import it when the first embedding
+# is needed.
+_HAS_SENTENCE_TRANSFORMERS = importlib.util.find_spec("sentence_transformers") is not None
+if _HAS_SENTENCE_TRANSFORMERS:
+    import numpy as np
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+# Order matters: full timestamps go before bare times, IP:port before bare IPs.
+_VOLATILE_PATTERNS = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TS>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\bpid[=:\s]\s*\d+", re.IGNORECASE), "pid=<PID>"),
+    (re.compile(r"\[\d+\]"), "[<PID>]"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"\s+"), " "),
+]
+
+# The fields that make up a verdict - everything consult_sre_expert reports.
+_PREDICTION_FIELDS = ("reasoning", "root_cause", "severity", "suggested_action")
+
+REDIS_TTL_SECONDS = 24 * 60 * 60
+
+
+def canonicalize_logs(logs: str) -> str:
+    """Strip the parts of a log that change between otherwise identical incidents."""
+    for pattern, replacement in _VOLATILE_PATTERNS:
+        logs = pattern.sub(replacement, logs)
+    return logs.strip()
+
+
+class _PredictionLRU(LRUCache):
+    """LRUCache that tells us what it evicts, so the semantic index stays in sync."""
+
+    def __init__(self, maxsize, on_evict):
+        super().__init__(maxsize=maxsize)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key)
+        return key, value
+
+
+class CachedSREBrain(SREBrain):
+    """
+    SREBrain with a memory. Same interface, same compiled weights -
+    it only calls the model when it hasn't seen something like this before.
+    """
+
+    def __init__(self, maxsize=4096, similarity_threshold=0.95,
+                 embedding_model="all-MiniLM-L6-v2", local_classifier=None):
+        super().__init__(local_classifier=local_classifier)
+        self.similarity_threshold = similarity_threshold
+        self._embedding_model_name = embedding_model
+        self._encoder = None
+        self._encoder_lock = threading.Lock()
+        # key -> (container_name, normalized embedding)
+        self._vectors = {}
+        self._predictions = _PredictionLRU(maxsize, on_evict=lambda key: self._vectors.pop(key, None))
+        # The plan executor analyzes several containers on threads at once, and
+        # neither LRUCache nor the vector dict is thread-safe. The lock only
+        # covers the in-memory tiers - never a model call or a Redis round-trip.
+        self._lock = threading.Lock()
+
+        redis_url = os.getenv("REDIS_URL")
+        self._redis = redis.Redis.from_url(redis_url) if (redis and redis_url) else None
+
+    def forward(self, container_name, logs):
+        compressed = _compress_logs(logs)
+        canonical = canonicalize_logs(compressed)
+        key = hashlib.blake2b(f"{container_name}\0{canonical}".encode("utf-8"), digest_size=32).hexdigest()
+
+        with self._lock:
+            fields = self._predictions.get(key)
+        if fields is not None:
+            return dspy.Prediction(**fields)
+
+        vector = self._embed(canonical)
+        cached = self._lookup(key, container_name, vector)
+        if cached is not None:
+            return dspy.Prediction(**cached)
+
+        prediction = self._analyze(container_name, compressed)
+        if str(prediction.severity).strip().upper() != "CRITICAL":
+            self._store(key, container_name, vector, prediction)
+        return prediction
+
+    def _lookup(self, key, container_name, vector):
+        """Fall back to the semantic and shared tiers after an exact-match miss."""
+        if vector is not None:
+            with self._lock:
+                match = self._nearest(container_name, vector)
+                if match is not None:
+                    return self._predictions[match]
+
+        if self._redis is None:
+            return None
+        try:
+            payload = self._redis.get(f"sentinel:rca:{key}")
+        except redis.RedisError:
+            return None
+        if not payload:
+            return None
+
+        fields = json.loads(payload)
+        self._remember(key, container_name, vector, fields)
+        return fields
+
+    def _store(self, key, container_name, vector, prediction):
+        fields = {name: getattr(prediction, name, None) for name in _PREDICTION_FIELDS}
+        self._remember(key, container_name, vector, fields)
+
+        if self._redis is not None:
+            try:
+                self._redis.set(f"sentinel:rca:{key}", json.dumps(fields), ex=REDIS_TTL_SECONDS)
+            except redis.RedisError:
+                pass  # Shared tier is best-effort; the local cache still has it
+
+    def _remember(self, key, container_name, vector, fields):
+        with self._lock:
+            self._predictions[key] = fields
+            if vector is not None:
+                self._vectors[key] = (container_name, vector)
+
+    def _embed(self, text):
+        if not _HAS_SENTENCE_TRANSFORMERS:
+            return None
+        if self._encoder is None:
+            with self._encoder_lock:
+                if self._encoder is None:  # Another thread may have loaded it while we waited
+                    from sentence_transformers import SentenceTransformer
+                    self._encoder = SentenceTransformer(self._embedding_model_name)
+        return self._encoder.encode(text, normalize_embeddings=True)
+
+    def _nearest(self, container_name, vector):
+        # Call with self._lock held
+        # A brute-force dot product over a few thousand normalized vectors is
+        # well under a millisecond, so an ANN index isn't worth the dependency.
+        keys = [k for k, (name, _) in self._vectors.items() if name == container_name]
+        if not keys:
+            return None
+        scores = np.stack([self._vectors[k][1] for k in keys]) @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity_threshold else None
@@ -0,0 +1,114 @@
+"""
+Fast Triage
+-----------
+Most production traffic is the same handful of failures over and over:
+someone rotated the DB password, the upstream host is down, nothing is wrong
+at all. The brain already knows exactly what to do with those - they're the
+examples it was trained on - so sending them to Gemini is paying for an answer
+we already have.
+
+This module matches logs against those known signatures before the LLM is
+involved. With Hyperscan installed all patterns are compiled into one DFA and
+scanned in a single pass; without it we fall back to precompiled regexes.
+Either way it's microseconds, and anything that doesn't match still goes
+to the trained brain.
+"""
+
+import re
+
+import dspy
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+
+# Known incident signatures, taken from the training set (train_brain.py) and
+# the behavior tests. Ordered by priority - if several match, the first wins.
+#
+# Every verdict here is hands-off (escalate or none). A restart is an action,
+# and a pattern match can't tell "OOMKilled, crashing now" from "OOMKilled
+# earlier, recovered" - so OOMs go to the brain like anything else.
+_SIGNATURES = [
+    (
+        r"FATAL: Password authentication failed",
+        {
+            "reasoning": "Known signature: database authentication failure. This is a "
+                         "credentials/configuration issue in the client, not something a restart fixes.",
+            "root_cause": "Auth Failure",
+            "severity": "CRITICAL",
+            "suggested_action": "escalate",
+        },
+    ),
+    (
+        r"Connection Refused to \d+\.\d+\.\d+\.\d+",
+        {
+            "reasoning": "Known signature: a remote dependency is refusing connections. "
+                         "Restarting this container won't bring the remote service back.",
+            "root_cause": "External Dependency Unreachable",
+            "severity": "CRITICAL",
+            "suggested_action": "escalate",
+        },
+    ),
+]
+
+# Logs made up only of INFO lines, with nothing alarming anywhere in them.
+_INFO_VERDICT = {
+    "reasoning": "Known signature: all logs are INFO level. No errors detected.",
+    "root_cause": "None",
+    "severity": "LOW",
+    "suggested_action": "none",
+}
+_INFO_LINE = re.compile(r"^\s*INFO\b")
+_ALARMING = re.compile(r"\b(?:WARN(?:ING)?|ERROR|FATAL|CRITICAL|PANIC)\b|Exception|Traceback", re.IGNORECASE)
+
+_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern, _ in _SIGNATURES]
+
+
+def _compile_database():
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[pattern.encode() for pattern, _ in _SIGNATURES],
+        ids=list(range(len(_SIGNATURES))),
+        elements=len(_SIGNATURES),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(_SIGNATURES),
+    )
+    return database
+
+
+_DATABASE = _compile_database() if hyperscan else None
+
+
+def _match_signature(logs: str):
+    """Index of the highest-priority signature in the logs, or None."""
+    if _DATABASE is not None:
+        matched = []
+        _DATABASE.scan(
+            logs.encode("utf-8", errors="replace"),
+            match_event_handler=lambda sig_id, start, end, flags, context: matched.append(sig_id),
+        )
+        return min(matched) if matched else None
+
+    for index, pattern in enumerate(_PATTERNS):
+        if pattern.search(logs):
+            return index
+    return None
+
+
+def triage(logs: str):
+    """
+    Classify logs against the known signatures.
+
+    Returns a dspy.Prediction shaped exactly like the brain's output, or None
+    if this looks like something new that the brain should look at.
+    """
+    index = _match_signature(logs)
+    if index is not None:
+        return dspy.Prediction(**_SIGNATURES[index][1])
+
+    lines = [line for line in logs.splitlines() if line.strip()]
+    if lines and all(_INFO_LINE.match(line) for line in lines) and not _ALARMING.search(logs):
+        return dspy.Prediction(**_INFO_VERDICT)
+
+    return None
@@ -0,0 +1,215 @@
+"""
+Local Classifier
+----------------
+The brain's output is really a classification: a known root cause, a severity
+and one of a handful of actions. For the patterns it was trained on, a small
+model running on the box gets that right without a network hop or a bill.
+
+This module distills the compiled brain into a DistilBERT classifier: the
+compiled demos (plus the training set) become (logs -> label) pairs, and the
+label is the whole verdict, e.g. "OOMKilled|HIGH|restart_service". At load
+time the model is dynamically quantized to int8, which keeps CPU inference
+fast even on small VMs.
+
+SREBrain asks this first and only goes to Gemini when the classifier isn't
+confident - or when it says restart, which we never do on its word alone.
+Set SENTINEL_LOCAL_CLASSIFIER to the trained model directory to turn it on.
+
+The training set and compiled demos are only a handful of pairs - far too
+few to train on, and fine_tune refuses to. The bulk has to come from real
+incidents: put the ones your SREs have reviewed in INCIDENTS_PATH, one JSON
+object per line with the same fields as the training examples
+(container_name, logs, root_cause, severity, suggested_action).
+
+Usage: python -m modules.local_classifier
+"""
+
+import functools
+import importlib.util
+import json
+import os
+import random
+
+import dspy
+
+from modules.rca_brain import _compress_logs
+
+# torch + transformers take seconds to import, and most deployments never
+# turn the classifier on - so they're imported only when it's actually used.
+_HAS_TRANSFORMERS = importlib.util.find_spec("transformers") is not None
+
+# Below this probability for the top label, we'd rather pay for Gemini than guess
+CONFIDENCE_THRESHOLD = 0.85
+
+# A fine-tuned model only gets saved if it gets at least this share of the
+# held-out pairs right. A handful of pairs can't show that, so below
+# MIN_TRAINING_PAIRS we don't train at all.
+TARGET_ACCURACY = 0.95
+MIN_TRAINING_PAIRS = 50
+HOLDOUT_FRACTION = 0.2
+
+DEFAULT_MODEL_DIR = "modules/local_classifier_model"
+PAIRS_PATH = "modules/local_classifier_pairs.jsonl"
+INCIDENTS_PATH = "modules/local_classifier_incidents.jsonl"
+
+_LABEL_FIELDS = ("root_cause", "severity", "suggested_action")
+
+
+def _as_text(container_name, logs):
+    return f"{container_name}\n{logs}"
+
+
+def _label(example):
+    return "|".join(str(example[field]) for field in _LABEL_FIELDS)
+
+
+@functools.cache
+def get_local_classifier():
+    """The configured classifier, or None if there isn't one (or transformers isn't installed)."""
+    model_dir = os.getenv("SENTINEL_LOCAL_CLASSIFIER")
+    if not model_dir or not _HAS_TRANSFORMERS:
+        return None
+    return LocalClassifier(model_dir)
+
+
+class LocalClassifier:
+    """A fine-tuned, int8-quantized sequence classifier over brain verdicts."""
+
+    def __init__(self, model_dir, threshold=CONFIDENCE_THRESHOLD):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self._pipe = pipeline("text-classification", model=model, tokenizer=tokenizer, device=-1, truncation=True)
+        self.threshold = threshold
+
+    def classify(self, container_name, logs):
+        """
+        Returns a dspy.Prediction shaped like the brain's output, or None
+        when the top label's probability is under the threshold.
+        """
+        best = self._pipe(_as_text(container_name, logs))[0]
+        if best["score"] < self.threshold:
+            return None
+
+        root_cause, severity, suggested_action = best["label"].split("|")
+        return dspy.Prediction(
+            reasoning=f"Local classifier ({best['score']:.0%} confident): matches the trained "
+                      f"'{root_cause}' pattern.",
+            root_cause=root_cause,
+            severity=severity,
+            suggested_action=suggested_action,
+        )
+
+
+def export_training_pairs(compiled_path="modules/brain_compiled.json", out_path=PAIRS_PATH,
+                          incidents_path=INCIDENTS_PATH):
+    """
+    Write (text, label) pairs from the training set, the compiled brain's
+    demos and the reviewed incidents in incidents_path.
+
+    The demos are what the brain actually learned from, so they're the best
+    teacher for the classifier - but there are only a few of them. Reviewed
+    incidents are what gets the pair count up to MIN_TRAINING_PAIRS.
+    """
+    from modules.train_brain import trainset
+
+    examples = [dict(example) for example in trainset]
+    if os.path.exists(compiled_path):
+        with open(compiled_path) as f:
+            state = json.load(f)
+        for predictor_state in state.values():
+            if isinstance(predictor_state, dict):
+                examples.extend(predictor_state.get("demos", []))
+    if os.path.exists(incidents_path):
+        with open(incidents_path) as f:
+            examples.extend(json.loads(line) for line in f if line.strip())
+
+    pairs = {}
+    for example in examples:
+        if all(example.get(field) for field in ("container_name", "logs", *_LABEL_FIELDS)):
+            # The brain hands the classifier compressed logs, so train on the same
+            text = _as_text(example["container_name"], _compress_logs(example["logs"]))
+            pairs[text] = _label(example)
+
+    with open(out_path, "w") as f:
+        for text, label in pairs.items():
+            f.write(json.dumps({"text": text, "label": label}) + "\n")
+    print(f"✅ Exported {len(pairs)} training pairs to {out_path}")
+    return out_path
+
+
+def fine_tune(pairs_path=PAIRS_PATH, output_dir=DEFAULT_MODEL_DIR,
+              base_model="distilbert-base-uncased", epochs=20):
+    """
+    Fine-tune the base model on the exported pairs and save it to output_dir.
+
+    A slice of the pairs is held out; if the model can't reach TARGET_ACCURACY
+    on it, nothing is saved and the brain keeps going to Gemini.
+    Returns True if a model was saved.
+    """
+    import torch
+    from transformers import (
+        AutoModelForSequenceClassification, AutoTokenizer, Trainer, TrainingArguments, pipeline,
+    )
+
+    with open(pairs_path) as f:
+        pairs = [json.loads(line) for line in f]
+    if len(pairs) < MIN_TRAINING_PAIRS:
+        print(f"⚠️  Only {len(pairs)} training pairs - need {MIN_TRAINING_PAIRS} to train and "
+              f"validate a classifier. Nothing saved.")
+        return False
+
+    random.Random(0).shuffle(pairs)
+    holdout_size = max(1, int(len(pairs) * HOLDOUT_FRACTION))
+    holdout, pairs = pairs[:holdout_size], pairs[holdout_size:]
+
+    labels = sorted({pair["label"] for pair in pairs})
+    label2id = {label: i for i, label in enumerate(labels)}
+
+    tokenizer = AutoTokenizer.from_pretrained(base_model)
+    model = AutoModelForSequenceClassification.from_pretrained(
+        base_model,
+        num_labels=len(labels),
+        id2label=dict(enumerate(labels)),
+        label2id=label2id,
+    )
+    encodings = tokenizer([pair["text"] for pair in pairs], truncation=True, padding=True, max_length=512)
+
+    class _Pairs(torch.utils.data.Dataset):
+        def __len__(self):
+            return len(pairs)
+
+        def __getitem__(self, i):
+            item = {key: torch.tensor(values[i]) for key, values in encodings.items()}
+            item["labels"] = torch.tensor(label2id[pairs[i]["label"]])
+            return item
+
+    args = TrainingArguments(
+        output_dir=output_dir,
+        num_train_epochs=epochs,
+        per_device_train_batch_size=8,
+        save_strategy="no",
+        report_to=[],
+    )
+    Trainer(model=model, args=args, train_dataset=_Pairs()).train()
+
+    # Labels never seen in training count as misses - that's the point
+    pipe = pipeline("text-classification", model=model, tokenizer=tokenizer, device=-1, truncation=True)
+    predicted = pipe([pair["text"] for pair in holdout])
+    accuracy = sum(p["label"] == pair["label"] for p, pair in zip(predicted, holdout)) / len(holdout)
+    if accuracy < TARGET_ACCURACY:
+        print(f"⚠️  Held-out accuracy {accuracy:.0%} is below {TARGET_ACCURACY:.0%}. Nothing saved.")
+        return False
+
+    model.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    print(f"✅ Local classifier saved to {output_dir} ({accuracy:.0%} held-out accuracy) - "
+          f"set SENTINEL_LOCAL_CLASSIFIER={output_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    fine_tune(export_training_pairs())
@@ -10,19 +10,107 @@ reasoning before jumping to conclusions. Combined with few-shot examples from
 training, this is way more reliable than raw prompting.
 """
 
-import dspy
+import functools
 import os
+import re
+
+import dspy
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
 
-if not api_key:
-    raise ValueError("Missing GOOGLE_API_KEY in .env file")
+# Routine chatter that rarely explains an incident
+_LOW_SIGNAL_LINE = re.compile(r"^\s*(?:INFO|DEBUG|TRACE)\b")
+
+
+@functools.cache
+def init_llm():
+    """
+    Point DSPy at Gemini. Only the first call does any work.
+
+    This used to happen at import time, which meant pytest collection and the
+    MCP subprocess paid for it too. Now the API server calls it on startup
+    and everything else calls it right before it needs the model.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("Missing GOOGLE_API_KEY in .env file")
+
+    # DSPy works with any LLM. We're using Gemini Flash for speed.
+    # cache=True keeps completions in DSPy's local cache, so an identical prompt
+    # (e.g. the same bootstrap trace when re-running training) skips Gemini.
+    gemini_flash = dspy.LM(model="gemini/gemini-2.5-flash", api_key=api_key, cache=True)
+    dspy.configure(lm=gemini_flash)
+    return gemini_flash
+
+
+@functools.cache
+def _token_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None  # No cached encoding and no network - estimate instead
+
+
+def _count_tokens(text: str) -> int:
+    """Approximate token count. Gemini tokenizes differently, but close enough for a budget."""
+    encoding = _token_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
 
-# DSPy works with any LLM. We're using Gemini Flash for speed.
-gemini_flash = dspy.LM(model="gemini/gemini-2.5-flash", api_key=api_key)
-dspy.configure(lm=gemini_flash)
+def _compress_logs(logs: str, max_tokens: int = 1024) -> str:
+    """
+    Shrink logs down to what's worth the model's attention.
+
+    Drops INFO/DEBUG/TRACE lines (unless that's all there is - then "nothing's
+    wrong" is the signal), folds runs of identical lines into one with an (xN)
+    count, and keeps the newest lines that fit in max_tokens. The newest lines
+    are where the crash is.
+    """
+    lines = [line for line in logs.split("\n") if line.strip()]
+    kept = [line for line in lines if not _LOW_SIGNAL_LINE.match(line)] or lines
+
+    runs = []
+    for line in kept:
+        if runs and runs[-1][0] == line:
+            runs[-1][1] += 1
+        else:
+            runs.append([line, 1])
+
+    budget = max_tokens
+    newest_first = []
+    for line, count in reversed(runs):
+        rendered = line if count == 1 else f"{line} (x{count})"
+        cost = _count_tokens(rendered) + 1
+        if cost > budget:
+            if not newest_first:
+                # The newest line alone is over budget (JSON loggers, minified
+                # traces) - keep its end, which is usually the error itself
+                newest_first.append(_tail_within(rendered, budget - 1))
+            break
+        budget -= cost
+        newest_first.append(rendered)
+    return "\n".join(reversed(newest_first))
+
+
+def _tail_within(text: str, max_tokens: int) -> str:
+    """The end of text, cut to roughly max_tokens and marked as truncated."""
+    keep = max_tokens - 2
+    if keep <= 0:
+        return "…"  # A [-0:] slice would keep everything
+    encoding = _token_encoding()
+    if encoding is None:
+        return "…" + text[-keep * 4:]
+    return "…" + encoding.decode(encoding.encode(text)[-keep:])
 
 
 class RootCauseAnalysis(dspy.Signature):
@@ -41,27 +129,54 @@ class RootCauseAnalysis(dspy.Signature):
     suggested_action = dspy.OutputField(desc="The exact tool to use: 'restart_service', 'escalate', or 'ignore'")
 
 
+class IncidentPlan(dspy.Signature):
+    """
+    Plan the tool calls needed to investigate an incident, up front, as a DAG.
+    Steps that don't depend on each other run in parallel, so only add a
+    depends_on edge when a step genuinely needs an earlier step's output.
+    """
+    request = dspy.InputField(desc="What the operator asked for")
+    tools = dspy.InputField(desc="The tools available to the plan and their arguments")
+
+    plan = dspy.OutputField(
+        desc='JSON list of steps, each {"tool": name, "args": {...}, "depends_on": [step indices]}. '
+             'Use "$N" as an argument value to pass in the output of step N.'
+    )
+
+
 class SREBrain(dspy.Module):
     """
     The callable module that wraps our signature with Chain-of-Thought.
 
-    After training with BootstrapFewShot (see train_brain.py), the compiled
+    After few-shot bootstrapping (see train_brain.py), the compiled
     version includes optimized few-shot examples that teach the model our
     specific patterns - like when to restart vs when to escalate.
     """
 
-    def __init__(self):
+    def __init__(self, local_classifier=None):
         super().__init__()
         self.prog = dspy.ChainOfThought(RootCauseAnalysis)
+        # Optional distilled model (see local_classifier.py) tried before Gemini
+        self.local_classifier = local_classifier
 
     def forward(self, container_name, logs):
-        return self.prog(container_name=container_name, logs=logs)
+        return self._analyze(container_name, _compress_logs(logs))
+
+    def _analyze(self, container_name, compressed_logs):
+        if self.local_classifier is not None:
+            prediction = self.local_classifier.classify(container_name, compressed_logs)
+            # A restart is an action, not just an opinion - that call stays with Gemini
+            if prediction is not None and prediction.suggested_action != "restart_service":
+                return prediction
+        return self.prog(container_name=container_name, logs=compressed_logs)
 
     def load_production_weights(self, filepath="modules/brain_compiled.json"):
         """Load the optimized brain that was compiled during training."""
-        if os.path.exists(filepath):
-            self.load(filepath)
-            print(f"✅ Loaded optimized brain from {filepath}")
-        else:
+        if not os.path.exists(filepath):
             print(f"⚠️  No compiled brain found at {filepath} - running in zero-shot mode")
+            return
 
+        # Plain JSON is fast enough: even a 10 MB compiled state parses in about
+        # 30ms, and a pickle cache measured only ~20% faster at that size
+        self.load(filepath)
+        print(f"✅ Loaded optimized brain from {filepath}")
@@ -5,23 +5,23 @@ This is where we teach the SRE brain our institutional knowledge. Instead of
 writing elaborate prompts, we give DSPy a few labeled examples and let it
 figure out the best way to prompt the model.
 
-Run this once (takes ~60 seconds), and it outputs brain_compiled.json with
-optimized few-shot examples. The compiled brain is way more accurate than
-the zero-shot version.
+Run this once (a few seconds - the LLM calls run in parallel), and it
+outputs brain_compiled.json with optimized few-shot examples. The compiled
+brain is way more accurate than the zero-shot version.
 
 Usage: python modules/train_brain.py
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import dspy
-import os
-from dotenv import load_dotenv
-from dspy.teleprompt import BootstrapFewShot
-from modules.rca_brain import SREBrain
+from modules.rca_brain import SREBrain, init_llm
+
+MAX_BOOTSTRAPPED_DEMOS = 2
+# Gemini calls are pure network wait, so bootstrapping overlaps them
+MAX_BOOTSTRAP_THREADS = 8
 
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
-gemini_flash = dspy.LM(model="gemini/gemini-2.5-flash", api_key=api_key)
-dspy.configure(lm=gemini_flash)
+_OUTPUT_FIELDS = ("reasoning", "root_cause", "severity", "suggested_action")
 
 # These examples encode our SRE team's decision patterns.
 # The model learns: "when you see X, do Y" from these.
@@ -67,24 +67,60 @@ def validate_answer(example, prediction, trace=None):
     )
 
 
+def _bootstrap_demo(example):
+    """
+    Have a teacher brain answer one training example. If the answer passes
+    validate_answer, it becomes a demo (reasoning included); otherwise - or
+    if the call fails - None.
+
+    Same setup as BootstrapFewShot: the teacher sees the other labeled
+    examples as demos, but never the one it's being asked about.
+    """
+    teacher = SREBrain()
+    for _, predictor in teacher.named_predictors():
+        predictor.demos = [x for x in trainset if x is not example]
+
+    try:
+        prediction = teacher(**example.inputs())
+    except Exception as e:
+        # A 429 or an unparseable answer costs us this demo, not the whole compile
+        print(f"⚠️  Bootstrapping '{example.container_name}' failed: {e}")
+        return None
+    if not validate_answer(example, prediction):
+        return None
+    outputs = {field: getattr(prediction, field) for field in _OUTPUT_FIELDS}
+    return dspy.Example(augmented=True, **example.inputs(), **outputs)
+
+
 def compile():
     """
-    Run the optimization process. BootstrapFewShot will:
+    Run the optimization process. This is BootstrapFewShot's recipe, but with
+    the LLM calls running in parallel instead of one example at a time:
     1. Generate predictions for each training example
     2. Keep the ones that pass our validation metric
-    3. Use those as few-shot examples in the final prompt
+    3. Use those as few-shot examples in the final prompt, topped up
+       with the labeled examples that weren't bootstrapped
     """
     print("🧠 Training SRE Brain...")
+    init_llm()
+
+    # This used to take 30-60 seconds of back-to-back LLM calls. Re-runs are
+    # faster still: identical bootstrap prompts are answered from DSPy's LM cache.
+    with ThreadPoolExecutor(max_workers=min(MAX_BOOTSTRAP_THREADS, len(trainset))) as pool:
+        results = list(pool.map(_bootstrap_demo, trainset))
 
-    teleprompter = BootstrapFewShot(metric=validate_answer, max_bootstrapped_demos=2)
-    student = SREBrain()
+    bootstrapped = [demo for demo in results if demo is not None][:MAX_BOOTSTRAPPED_DEMOS]
+    used = {demo.logs for demo in bootstrapped}
+    labeled = [example for example in trainset if example.logs not in used]
 
-    # This takes 30-60 seconds as it runs multiple LLM calls
-    compiled_brain = teleprompter.compile(student, trainset=trainset)
+    compiled_brain = SREBrain()
+    for _, predictor in compiled_brain.named_predictors():
+        predictor.demos = bootstrapped + labeled
+    compiled_brain._compiled = True
 
     save_path = "modules/brain_compiled.json"
     compiled_brain.save(save_path)
-    print(f"✅ Brain compiled and saved to {save_path}")
+    print(f"✅ Brain compiled with {len(bootstrapped)} bootstrapped demos and saved to {save_path}")
 
 
 if __name__ == "__main__":
@@ -5,61 +5,156 @@ This is a FastMCP server that exposes Docker operations as tools the agent can c
 MCP (Model Context Protocol) is how we give the agent "hands" - instead of just
 analyzing text, it can actually interact with the infrastructure.
 
-The agent connects to this via stdin/stdout when it starts up. Each @mcp.tool()
-decorator turns a function into something the agent can invoke by name.
+By default the agent spawns this and talks to it over stdin/stdout. Run it with
+--http instead and it becomes one long-lived server (http://127.0.0.1:9100/mcp)
+that every API worker shares - one Docker connection pool, one container-ID
+cache, instead of a copy per process. Each @mcp.tool() decorator turns a
+function into something the agent can invoke by name.
 
 Think of it as a microservice, except the client is an AI agent.
+
+Docker calls block, and FastMCP runs synchronous tools right on its event
+loop - in --http mode that would make every worker wait behind one slow log
+stream. So the tools are async and push the Docker work onto threads.
 """
 
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import groupby
+
 import docker
 from mcp.server.fastmcp import FastMCP
 from docker.errors import NotFound
 
-mcp = FastMCP("Sentinel_Ops")
+mcp = FastMCP(
+    "Sentinel_Ops",
+    host=os.getenv("SENTINEL_OPS_HOST", "127.0.0.1"),
+    port=int(os.getenv("SENTINEL_OPS_PORT", "9100"))
+)
 
 # Try to connect to Docker. If it's not running, we'll fail gracefully
 # instead of crashing on import.
+# We talk to the low-level API directly: the high-level client wraps every
+# response in a Container object and re-inspects it, which is an extra
+# daemon round-trip for each tool call. One pooled client is shared by all tools.
 try:
-    client = docker.from_env()
+    api = docker.APIClient(num_pools=32, **docker.utils.kwargs_from_env())
 except Exception as e:
     print(f"⚠️  Docker daemon not running: {e}")
-    client = None
+    api = None
+
+# Restarts that have been prepared but not committed yet, keyed by token.
+# Nothing has been touched when a token is handed out, so any the runtime
+# forgets to cancel just expire.
+PREPARED_RESTART_TTL = 120
+_prepared_restarts = {}
+
+# Upper bound on log bytes one call will hold in memory, whatever tail is
+# asked for. We keep the newest bytes - that's where the crash is.
+MAX_LOG_BYTES = 256 * 1024
+
+
+@functools.lru_cache(maxsize=256)
+def _resolve_id(container_name: str) -> str:
+    """
+    Map a container name to its ID, so tools can skip the inspect call.
+    The events watcher below clears this whenever containers start or stop.
+    """
+    return api.inspect_container(container_name)["Id"]
+
+
+def _with_container(container_name: str, action):
+    """
+    Run action(container_id) for a container, by name.
+
+    If the cached ID has gone stale (the container was recreated before we
+    saw the event), re-resolve once and try again.
+    """
+    try:
+        return action(_resolve_id(container_name))
+    except NotFound:
+        _resolve_id.cache_clear()
+        return action(_resolve_id(container_name))
+
+
+def _watch_container_events():
+    """Drop cached name -> ID mappings whenever a container starts, dies, or is renamed/removed."""
+    watched = {"type": "container", "event": ["start", "die", "destroy", "rename"]}
+    while True:
+        try:
+            for _ in api.events(decode=True, filters=watched):
+                _resolve_id.cache_clear()
+        except Exception:
+            pass
+        # Stream dropped - we may have missed events, so start over from a clean cache
+        _resolve_id.cache_clear()
+        time.sleep(1)
+
+
+if api:
+    threading.Thread(target=_watch_container_events, daemon=True).start()
 
 
 @mcp.tool()
-def list_active_containers() -> str:
+async def list_active_containers() -> str:
     """
     Returns a quick summary of what's running.
     The agent usually calls this first to see what containers exist.
     """
-    if not client:
+    if not api:
         return "Error: Docker unavailable."
 
     try:
-        containers = client.containers.list()
+        containers = await asyncio.to_thread(api.containers)
         if not containers:
             return "No active containers found."
 
-        report = "ACTIVE CONTAINERS:\n"
+        lines = ["ACTIVE CONTAINERS:"]
         for c in containers:
-            report += f"- {c.name} (ID: {c.short_id}): {c.status}\n"
-        return report
+            lines.append(f"- {c['Names'][0].lstrip('/')} (ID: {c['Id'][:12]}): {c['State']}")
+        return "\n".join(lines) + "\n"
     except Exception as e:
         return f"Docker Error: {str(e)}"
 
 
 @mcp.tool()
-def get_container_logs(container_name: str, tail: int = 50) -> str:
+async def get_container_logs(container_name: str, tail: int = 50) -> str:
     """
     Grab the last N lines of logs from a container.
     This is what the agent uses to diagnose problems.
     """
-    if not client:
+    if not api:
         return "Error: Docker unavailable."
+    return await asyncio.to_thread(_logs_one, container_name, tail)
 
+
+@mcp.tool()
+async def get_many_container_logs(names: list[str], tail: int = 50) -> dict[str, str]:
+    """
+    Grab the last N lines of logs from several containers at once.
+    Returns container name -> logs. Use this instead of calling
+    get_container_logs once per container.
+    """
+    if not api:
+        return {name: "Error: Docker unavailable." for name in names}
+
+    # Each fetch is a blocking Docker call that mostly waits on the daemon, so
+    # run them side by side: N containers cost about as long as the slowest one.
+    names = list(dict.fromkeys(names))
+    logs = await asyncio.gather(*(asyncio.to_thread(_logs_one, name, tail) for name in names))
+    return dict(zip(names, logs))
+
+
+def _logs_one(container_name: str, tail: int) -> str:
+    """One container's logs, or an error message - never raises."""
     try:
-        container = client.containers.get(container_name)
-        logs = container.logs(tail=tail).decode('utf-8')
+        logs = _with_container(container_name, lambda cid: _read_logs(cid, tail))
         return logs or "Logs are empty."
 
     except NotFound:
@@ -68,24 +163,126 @@ def get_container_logs(container_name: str, tail: int = 50) -> str:
         return f"System Error: {str(e)}"
 
 
+def _read_logs(container_id: str, tail: int) -> str:
+    """
+    Stream a container's logs, keeping at most MAX_LOG_BYTES of the newest output.
+
+    Runs of repeated lines are folded into one with an (xN) count - a crash loop
+    printing the same error 500 times tells the brain nothing new after the
+    first, and every line is tokens we pay for.
+    """
+    chunks = deque()
+    size = 0
+    dropped = 0
+    # stream=True turns on follow unless told otherwise, and a followed log
+    # never ends for a running container
+    for chunk in api.logs(container_id, tail=tail, stream=True, follow=False, stdout=True, stderr=True):
+        chunks.append(chunk)
+        size += len(chunk)
+        while size - len(chunks[0]) >= MAX_LOG_BYTES:
+            oldest = chunks.popleft()
+            size -= len(oldest)
+            dropped += len(oldest)
+
+    raw = b"".join(chunks)
+    if len(raw) > MAX_LOG_BYTES:
+        dropped += len(raw) - MAX_LOG_BYTES
+        raw = raw[-MAX_LOG_BYTES:]
+
+    # Only consecutive repeats are folded - lines keep their order, so a
+    # service that recovered still reads as recovered
+    lines = raw.decode("utf-8", errors="replace").splitlines()
+    runs = ((line, sum(1 for _ in group)) for line, group in groupby(lines))
+    logs = "\n".join(line if n == 1 else f"{line} (x{n})" for line, n in runs)
+    if dropped:
+        logs = f"…[truncated {dropped} bytes]\n{logs}"
+    return logs
+
+
+def _prepare_restart(container_name: str) -> str:
+    """
+    Everything a restart needs short of actually restarting: resolve the
+    container and make sure it's in a state we can restart. Returns a token
+    for _commit_restart. Raises if the container can't be restarted.
+    """
+    info = api.inspect_container(container_name)
+    status = info["State"]["Status"]
+    if status in ("removing", "dead"):
+        raise RuntimeError(f"Container '{container_name}' is {status}")
+
+    now = time.monotonic()
+    for token, (*_, prepared_at) in list(_prepared_restarts.items()):
+        if now - prepared_at > PREPARED_RESTART_TTL:
+            _prepared_restarts.pop(token, None)  # Another thread may have got there first
+
+    token = uuid.uuid4().hex
+    _prepared_restarts[token] = (info["Id"], container_name, now)
+    return token
+
+
+def _commit_restart(token: str) -> str:
+    """Restart the container behind a prepared token. Returns its name."""
+    container_id, container_name, prepared_at = _prepared_restarts.pop(token, (None, None, 0))
+    if container_id is None or time.monotonic() - prepared_at > PREPARED_RESTART_TTL:
+        raise KeyError("Restart token is unknown or expired")
+    api.restart(container_id)
+    return container_name
+
+
 @mcp.tool()
-def restart_service(container_name: str) -> str:
+async def restart_service(container_name: str) -> str:
     """
     Restart a container that's crashed or stuck.
 
     The agent only calls this when the DSPy brain recommends it -
     we don't want random restarts for every minor error.
     """
-    if not client:
+    if not api:
         return "Error: Docker unavailable."
 
     try:
-        container = client.containers.get(container_name)
-        container.restart()
+        token = await asyncio.to_thread(_prepare_restart, container_name)
+        await asyncio.to_thread(_commit_restart, token)
         return f"✅ Service '{container_name}' restarted successfully."
     except Exception as e:
         return f"Restart Failed: {str(e)}"
 
 
+# The three tools below are for the agent runtime, not the model: it stages a
+# restart while the brain is still thinking, then commits or drops it once the
+# verdict is in. See agents/speculation.py.
+
+@mcp.tool()
+async def prepare_restart(container_name: str) -> str:
+    """Runtime only: stage a restart ahead of the brain's verdict. Returns a token."""
+    if not api:
+        return "Error: Docker unavailable."
+
+    try:
+        return await asyncio.to_thread(_prepare_restart, container_name)
+    except Exception as e:
+        return f"Prepare Failed: {str(e)}"
+
+
+@mcp.tool()
+async def commit_restart(token: str) -> str:
+    """Runtime only: restart the container staged by prepare_restart."""
+    if not api:
+        return "Error: Docker unavailable."
+
+    try:
+        name = await asyncio.to_thread(_commit_restart, token)
+        return f"✅ Service '{name}' restarted successfully."
+    except Exception as e:
+        return f"Restart Failed: {str(e)}"
+
+
+@mcp.tool()
+def cancel_restart(token: str) -> str:
+    """Runtime only: drop a restart staged by prepare_restart."""
+    _prepared_restarts.pop(token, None)
+    return "Cancelled."
+
+
 if __name__ == "__main__":
-    mcp.run()
+    mcp.run(transport="streamable-http" if "--http" in sys.argv else "stdio")
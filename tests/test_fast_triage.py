@@ -0,0 +1,48 @@
+"""
+Fast Triage Tests
+-----------------
+The triage layer answers without ever asking the brain, so it has to agree
+with what the brain was taught. These tests replay the training scenarios and
+check the canned verdicts match - and that anything unfamiliar is passed
+through to the brain instead of guessed at.
+"""
+
+from modules.fast_triage import triage
+
+
+def test_oom_goes_to_the_brain():
+    """
+    Triage never restarts on a pattern match - "OOMKilled earlier, recovered"
+    looks just like a live crash to a regex.
+    """
+    assert triage("Error: Java heap space. java.lang.OutOfMemoryError. Terminating process.") is None
+    assert triage("WARNING: OOMKilled earlier, recovered") is None
+
+
+def test_auth_failure_is_escalated():
+    """Restarting won't fix bad credentials - a human needs to look at it."""
+    prediction = triage("FATAL: Password authentication failed for user 'admin'. Connection closed.")
+
+    assert prediction is not None
+    assert prediction.suggested_action == "escalate"
+
+
+def test_remote_database_down_is_not_restarted():
+    """Same scenario as test_smart_refusal, but caught before the LLM."""
+    prediction = triage("CRITICAL: Database Connection Refused to 192.168.1.50:5432")
+
+    assert prediction is not None
+    assert prediction.suggested_action in ["escalate", "ignore", "none"]
+
+
+def test_info_only_logs_need_no_action():
+    prediction = triage("INFO: Rendered page in 20ms. INFO: Cache hit.")
+
+    assert prediction is not None
+    assert prediction.suggested_action == "none"
+
+
+def test_novel_logs_go_to_the_brain():
+    """Anything we don't recognize must fall through, not get a guessed verdict."""
+    assert triage("WARN: disk usage at 91% on /var/lib/postgres") is None
+    assert triage("INFO: request served\nERROR: upstream returned 502") is None
@@ -9,7 +9,7 @@ is an external database that's down.
 """
 
 import pytest
-from modules.rca_brain import SREBrain
+from modules.rca_brain import SREBrain, _compress_logs, _count_tokens, init_llm
 
 
 def test_smart_refusal():
@@ -23,6 +23,7 @@ def test_smart_refusal():
     This is the kind of nuance that separates a useful SRE bot from a
     dangerous one that just restarts everything.
     """
+    init_llm()
     brain = SREBrain()
     brain.load_production_weights("modules/brain_compiled.json")
 
@@ -45,5 +46,43 @@ def test_smart_refusal():
     print("✅ PASSED: Brain correctly identified external dependency issue.")
 
 
+def test_log_compression_keeps_the_signal():
+    """
+    Compression must only throw away noise. The error lines - and the fact
+    that they repeated - have to survive, or the brain is reasoning blind.
+    """
+    logs = "\n".join([
+        "INFO: Worker started",
+        "ERROR: Java heap space",
+        "ERROR: Java heap space",
+        "ERROR: Java heap space",
+        "DEBUG: gc pause 900ms",
+        "FATAL: java.lang.OutOfMemoryError. Terminating process.",
+    ])
+
+    compressed = _compress_logs(logs)
+
+    assert compressed == (
+        "ERROR: Java heap space (x3)\n"
+        "FATAL: java.lang.OutOfMemoryError. Terminating process."
+    )
+    # Healthy services are all INFO - that has to reach the brain too
+    assert _compress_logs("INFO: Rendered page in 20ms.") == "INFO: Rendered page in 20ms."
+
+
+def test_log_compression_truncates_a_huge_line():
+    """One enormous line (a JSON log record, a minified trace) must still fit the budget."""
+    line = "ERROR: " + "x" * 200_000 + " upstream reset by peer"
+
+    compressed = _compress_logs(line, max_tokens=1024)
+
+    assert _count_tokens(compressed) <= 1024
+    assert compressed.startswith("…")
+    assert compressed.endswith("upstream reset by peer")
+
+    # Even a budget too small for any of the line keeps only the marker
+    assert _compress_logs("x" * 40, max_tokens=1) == "…"
+
+
 if __name__ == "__main__":
     test_smart_refusal()
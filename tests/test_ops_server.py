@@ -0,0 +1,53 @@
+"""
+Ops Server Tests
+----------------
+What get_container_logs hands the agent is what the brain reasons about, so
+the log reader must not reorder history or hold unbounded output. These run
+_read_logs against a stub Docker client - no daemon needed.
+"""
+
+import servers.ops_server as ops_server
+
+
+class StubAPI:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def logs(self, container_id, **kwargs):
+        # docker-py follows a streamed log by default - that would never return
+        assert kwargs.get("stream") and not kwargs.get("follow", kwargs.get("stream"))
+        return iter(self._chunks)
+
+
+def _read(monkeypatch, chunks):
+    monkeypatch.setattr(ops_server, "api", StubAPI(chunks))
+    return ops_server._read_logs("abc123", tail=50)
+
+
+def test_only_consecutive_repeats_are_folded(monkeypatch):
+    """A service that errored and then recovered must still read as recovered."""
+    logs = _read(monkeypatch, [
+        b"INFO: healthy\n",
+        b"ERROR: upstream reset\n",
+        b"INFO: healthy\n",
+        b"INFO: healthy\n",
+    ])
+
+    assert logs == "INFO: healthy\nERROR: upstream reset\nINFO: healthy (x2)"
+
+
+def test_crash_loop_is_folded(monkeypatch):
+    logs = _read(monkeypatch, [b"FATAL: cannot bind :8080\n"] * 500)
+
+    assert logs == "FATAL: cannot bind :8080 (x500)"
+
+
+def test_output_is_capped_to_the_newest_bytes(monkeypatch):
+    monkeypatch.setattr(ops_server, "MAX_LOG_BYTES", 70)
+    chunks = [f"line {i:04d}\n".encode() for i in range(100)]  # 10 bytes each
+
+    logs = _read(monkeypatch, chunks)
+    header, *lines = logs.split("\n")
+
+    assert header == "…[truncated 930 bytes]"
+    assert lines == [f"line {i:04d}" for i in range(93, 100)]  # The newest 70 bytes
@@ -0,0 +1,64 @@
+"""
+Plan Executor Tests
+-------------------
+The planner is an LLM, so its plans are only as good as the validation in
+front of them. These tests feed parse_plan (and the executor's cycle check)
+the kinds of mistakes the model actually makes.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from agents.plan_executor import PlanExecutor, parse_plan
+
+
+def _plan(*steps):
+    return json.dumps(list(steps))
+
+
+def test_step_references_become_dependencies():
+    """The model often uses "$0" without listing step 0 in depends_on."""
+    steps = parse_plan(_plan(
+        {"tool": "get_container_logs", "args": {"container_name": "worker-node"}},
+        {"tool": "consult_sre_expert", "args": {"container_name": "worker-node", "logs": "$0"}},
+    ))
+
+    assert steps[0]["depends_on"] == []
+    assert steps[1]["depends_on"] == [0]
+
+
+def test_code_fences_are_ignored():
+    raw = "```json\n" + _plan({"tool": "list_active_containers"}) + "\n```"
+
+    assert parse_plan(raw) == [{"tool": "list_active_containers", "args": {}, "depends_on": []}]
+
+
+@pytest.mark.parametrize("depends_on", [[5], [-1], [0]])
+def test_bad_dependency_indices_are_rejected(depends_on):
+    """Out of range, negative, or a step depending on itself."""
+    with pytest.raises(ValueError):
+        parse_plan(_plan({"tool": "list_active_containers", "depends_on": depends_on}))
+
+
+def test_reference_to_missing_step_is_rejected():
+    with pytest.raises(ValueError):
+        parse_plan(_plan({"tool": "consult_sre_expert", "args": {"container_name": "db", "logs": "$3"}}))
+
+
+def test_unplannable_tools_are_rejected():
+    """Restarts must stay behind the brain's verdict, never in a plan."""
+    with pytest.raises(ValueError):
+        parse_plan(_plan({"tool": "restart_service", "args": {"container_name": "db"}}))
+
+
+def test_cycles_are_rejected_before_anything_runs():
+    steps = parse_plan(_plan(
+        {"tool": "get_container_logs", "args": {"container_name": "a"}, "depends_on": [1]},
+        {"tool": "get_container_logs", "args": {"container_name": "b"}, "depends_on": [0]},
+    ))
+    executor = PlanExecutor(ops_tools=None, local_tools={})
+
+    with pytest.raises(ValueError, match="cycle"):
+        asyncio.run(executor.execute(steps, tool_context=None))
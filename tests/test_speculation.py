@@ -0,0 +1,102 @@
+"""
+Speculative Restart Tests
+-------------------------
+Staging a restart early is only an optimization. Whatever happens to the
+staged restart - the brain says no, the token expires, the server restarts -
+the agent's own restart_service call has to behave exactly as if nothing had
+been staged. These tests drive the callbacks against a stub toolbox.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import agents.speculation as speculation
+from agents.speculation import SpeculativeRestarts
+
+TOKEN = "0123456789abcdef0123456789abcdef"
+CRASH_LOGS = "Error: Java heap space. java.lang.OutOfMemoryError. Terminating process."
+
+
+class StubToolbox:
+    def __init__(self, commit_response="✅ Service 'worker-node' restarted successfully."):
+        self.commit_response = commit_response
+        self.calls = []
+
+    async def call(self, name, args, tool_context):
+        self.calls.append(name)
+        if name == "prepare_restart":
+            return TOKEN
+        if name == "commit_restart":
+            return self.commit_response
+        return "Cancelled."
+
+
+def _tool(name):
+    return SimpleNamespace(name=name)
+
+
+def _restart_after_crash(toolbox, before_restart=None):
+    """Fetch crashing logs, optionally do something, then ask for the restart."""
+    restarts = SpeculativeRestarts(ops_tools=None)
+    restarts._toolbox = toolbox
+    args = {"container_name": "worker-node"}
+
+    async def scenario():
+        await restarts.after_tool(_tool("get_container_logs"), args, None, CRASH_LOGS)
+        await asyncio.sleep(0)  # Let the staging task finish
+        if before_restart:
+            before_restart(restarts)
+        return await restarts.before_tool(_tool("restart_service"), args, None)
+
+    return asyncio.run(scenario())
+
+
+def test_staged_restart_is_committed():
+    toolbox = StubToolbox()
+    result = _restart_after_crash(toolbox)
+
+    assert result == {"result": toolbox.commit_response}
+    assert toolbox.calls == ["prepare_restart", "commit_restart"]
+
+
+def test_failed_commit_falls_back_to_real_restart():
+    """If the server has lost the token, returning None lets restart_service run."""
+    toolbox = StubToolbox(commit_response="Restart Failed: 'Restart token is unknown or expired'")
+
+    assert _restart_after_crash(toolbox) is None
+
+
+def test_expired_staged_restart_is_not_used(monkeypatch):
+    toolbox = StubToolbox()
+
+    def age_past_ttl(restarts):
+        now = speculation.time.monotonic()
+        monkeypatch.setattr(speculation.time, "monotonic", lambda: now + speculation.STAGED_RESTART_TTL + 1)
+
+    assert _restart_after_crash(toolbox, before_restart=age_past_ttl) is None
+    assert "commit_restart" not in toolbox.calls
+
+
+def test_sessions_dont_share_staged_restarts():
+    """One conversation's verdict (or restart) must not use another's staged token."""
+    toolbox = StubToolbox()
+    restarts = SpeculativeRestarts(ops_tools=None)
+    restarts._toolbox = toolbox
+    args = {"container_name": "worker-node"}
+    alice = SimpleNamespace(session=SimpleNamespace(user_id="u1", id="alice"))
+    bob = SimpleNamespace(session=SimpleNamespace(user_id="u2", id="bob"))
+
+    async def scenario():
+        await restarts.after_tool(_tool("get_container_logs"), args, alice, CRASH_LOGS)
+        await asyncio.sleep(0)
+        # Bob's brain says escalate - that's no reason to drop Alice's staged restart
+        await restarts.after_tool(_tool("consult_sre_expert"), args, bob, {"recommended_action": "escalate"})
+        # And Bob restarting doesn't get to spend Alice's token
+        bob_result = await restarts.before_tool(_tool("restart_service"), args, bob)
+        alice_result = await restarts.before_tool(_tool("restart_service"), args, alice)
+        return bob_result, alice_result
+
+    bob_result, alice_result = asyncio.run(scenario())
+
+    assert bob_result is None
+    assert alice_result == {"result": toolbox.commit_response}